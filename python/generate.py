@@ -1,16 +1,13 @@
+import copy
 import json
 import pickle
-from sklearn.metrics.pairwise import cosine_similarity
+import hashlib
+import threading
 import requests
 import re
 
-# Load models
-with open("models/recommender.pkl", "rb") as f:
-    vectorizer = pickle.load(f)
-
-# Load processed data
-with open("data/processed_data.json", "r") as f:
-    data = json.load(f)
+# Manifest written by train.py, pointing at the current generation of artifacts
+MANIFEST_PATH = "data/manifest.json"
 
 # Fetch all items from Showdown
 def fetch_all_items():
@@ -18,7 +15,7 @@ def fetch_all_items():
     url = "https://play.pokemonshowdown.com/data/items.js"
     
     # Fetch the content of the items.js file
-    response = requests.get(url)
+    response = requests.get(url, timeout=10)
     if response.status_code != 200:
         raise Exception(f"Failed to fetch data: {response.status_code}")
     
@@ -35,12 +32,144 @@ def fetch_all_items():
     
     return names
 
-all_items = fetch_all_items()
+class Snapshot:
+    """
+    Bundle of everything a query needs: the vectorizer, the teams, the
+    Showdown items and the precomputed TF-IDF matrix of the teams.
+    A snapshot is never modified once built; reload() replaces it as a whole.
+    `items_stale` is set when the items are carried over from an older
+    snapshot because Showdown could not be reached.
+    """
+    def __init__(self, version, vectorizer, data, all_items, items_stale=False):
+        self.version = version
+        self.vectorizer = vectorizer
+        self.data = data
+        self.all_items = all_items
+        self.items_stale = items_stale
+
+        # Build the TF-IDF matrix once instead of on every query
+        team_descriptions = [" ".join([p["name"] for p in team["pokemons"]]) for team in data]
+        self.tfidf_matrix = vectorizer.transform(team_descriptions)
+
+        # Index of every Pokémon name appearing in the teams
+        self.pokemon_names = list(dict.fromkeys(p["name"] for team in data for p in team["pokemons"]))
+
+def read_manifest():
+    """
+    Read the manifest written by train.py once a generation is complete.
+    """
+    with open(MANIFEST_PATH, "r") as f:
+        return json.load(f)
+
+def load_snapshot(manifest, previous=None):
+    """
+    Load the generation the manifest points at and build a new snapshot.
+    Raises if its files on disk are not the ones the manifest describes.
+    If Showdown cannot be reached, the items of the previous snapshot are kept.
+    """
+    with open(manifest["model_path"], "rb") as f:
+        model_bytes = f.read()
+    with open(manifest["data_path"], "rb") as f:
+        data_bytes = f.read()
+
+    if hashlib.sha256(model_bytes).hexdigest() != manifest["model_sha256"]:
+        raise Exception(f"{manifest['model_path']} does not match {MANIFEST_PATH}")
+    if hashlib.sha256(data_bytes).hexdigest() != manifest["data_sha256"]:
+        raise Exception(f"{manifest['data_path']} does not match {MANIFEST_PATH}")
+
+    # Load models
+    vectorizer = pickle.loads(model_bytes)
+
+    # Load processed data
+    data = json.loads(data_bytes)
+
+    # Fetch all items, falling back to the previous list on a reload
+    items_stale = False
+    try:
+        all_items = fetch_all_items()
+    except Exception as e:
+        if previous is None:
+            raise
+        print(f"Could not refresh Showdown items, keeping the previous list: {e}")
+        all_items = previous.all_items
+        items_stale = True
+
+    return Snapshot(manifest["version"], vectorizer, data, all_items, items_stale)
+
+def refresh_items(snapshot):
+    """
+    Retry the Showdown items of a snapshot built with a stale list.
+    Returns a copy of the snapshot with the fresh items, or the snapshot
+    itself if Showdown still cannot be reached.
+    """
+    try:
+        all_items = fetch_all_items()
+    except Exception as e:
+        print(f"Could not refresh Showdown items, version {snapshot.version} still uses a stale list: {e}")
+        return snapshot
+
+    # Copy rather than modify, queries may still be reading this snapshot
+    refreshed = copy.copy(snapshot)
+    refreshed.all_items = all_items
+    refreshed.items_stale = False
+    return refreshed
+
+# Current snapshot, replaced as a whole by reload()
+_snapshot = load_snapshot(read_manifest())
+_reload_lock = threading.Lock()
+
+def get_snapshot():
+    """
+    Return the snapshot currently serving queries.
+    """
+    return _snapshot
+
+def reload():
+    """
+    Build a new snapshot from the artifacts on disk and swap it in, unless
+    the manifest still describes the snapshot already serving. In that case
+    only the Showdown items are fetched again, if they are stale.
+    Queries already running keep the snapshot they started with. If loading
+    fails, the exception is raised and the current snapshot stays in place.
+    """
+    global _snapshot
+    with _reload_lock:
+        manifest = read_manifest()
+        if manifest["version"] != _snapshot.version:
+            _snapshot = load_snapshot(manifest, _snapshot)
+        elif _snapshot.items_stale:
+            _snapshot = refresh_items(_snapshot)
+        return _snapshot
+
+def start_background_reload(interval):
+    """
+    Reload the artifacts every `interval` seconds in a daemon thread.
+    """
+    stop = threading.Event()
+
+    def run():
+        while not stop.wait(interval):
+            try:
+                previous = _snapshot
+                snapshot = reload()
+                if snapshot.version != previous.version:
+                    print(f"Reloaded artifacts, now serving version {snapshot.version}")
+                elif snapshot is not previous:
+                    print(f"Refreshed Showdown items for version {snapshot.version}")
+            except Exception as e:
+                print(f"Reload failed, still serving version {_snapshot.version}: {e}")
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return stop
 
-def parse_instruction(instruction):
+def parse_instruction(instruction, snapshot=None):
     """
     Parse the instruction to detect Pokémon, items, Tera types, types, and roles.
     """
+    if snapshot is None:
+        snapshot = get_snapshot()
+
     parsed = {
         "pokemon": [],  # List of Pokémon names
         "pokemon_with_items": [],  # List of Pokémon with specific items (e.g., "Pikachu holding Light Ball")
@@ -51,14 +180,13 @@ def parse_instruction(instruction):
     }
 
     # Detect Pokémon names
-    for team in data:
-        for p in team["pokemons"]:
-            if p["name"].lower() in instruction.lower() and p["name"] not in parsed["pokemon"]:
-                parsed["pokemon"].append(p["name"])
+    for name in snapshot.pokemon_names:
+        if name.lower() in instruction.lower():
+            parsed["pokemon"].append(name)
 
     # Detect Pokémon with specific items (e.g., "Pikachu holding Light Ball")
     for pokemon in parsed["pokemon"]:
-        for item in all_items:
+        for item in snapshot.all_items:
             if f"{pokemon.lower()} with {item.lower()}" in instruction.lower() or f"{pokemon.lower()} holding {item.lower()}" in instruction.lower():
                 parsed["pokemon_with_items"].append({"pokemon": pokemon, "item": item})
 
@@ -92,11 +220,11 @@ def parse_instruction(instruction):
 
     return parsed
 
-def match_team(instruction, team):
+def match_team(instruction, team, snapshot=None):
     """
     Check if a team matches the given instruction and count the number of matches.
     """
-    parsed = parse_instruction(instruction)
+    parsed = parse_instruction(instruction, snapshot)
     match_count = 0
 
     # Check for Pokémon in the instruction
@@ -143,17 +271,15 @@ def generate_pokepaste(instruction):
     """
     Generate a Poképaste based on the instruction.
     """
-    parsed = parse_instruction(instruction)
-    print(parsed)
+    # Pin the snapshot so a concurrent reload does not affect this query
+    snapshot = get_snapshot()
+    data = snapshot.data
 
-    # Find the best matching team
-    team_descriptions = [" ".join([p["name"] for p in team["pokemons"]]) for team in data]
-    tfidf_matrix = vectorizer.transform(team_descriptions)
-    query_vector = vectorizer.transform([instruction])
-    similarities = cosine_similarity(query_vector, tfidf_matrix).flatten()
+    parsed = parse_instruction(instruction, snapshot)
+    print(parsed)
 
     # Calculate match scores for all teams
-    match_scores = [match_team(instruction, team) for team in data]
+    match_scores = [match_team(instruction, team, snapshot) for team in data]
 
     # Find the maximum match score
     max_score = max(match_scores)
@@ -180,7 +306,7 @@ def generate_pokepaste(instruction):
         }
         simplified_teams.append(simplified_team)
 
-    return simplified_teams
+    return {"version": snapshot.version, "teams": simplified_teams}
 
 if __name__ == "__main__":
     instruction = "I want a team with a Pikachu holding a Light Ball and using Thunderbolt. Include a strong attacker and a Water-type Pokémon."
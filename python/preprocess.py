@@ -214,8 +214,10 @@ def preprocess_data(folder_path, max_files=None):
                     problematic_files.append((entry.name, str(e)))
                     logging.error(f"Error processing {entry.name}: {e}")
     
-    with open("data/processed_data.json", "w", encoding="utf-8") as f:
+    # Write to a temporary file and swap it in so readers never see a partial file
+    with open("data/processed_data.json.tmp", "w", encoding="utf-8") as f:
         json.dump(all_pokepastes, f, indent=4)
+    os.replace("data/processed_data.json.tmp", "data/processed_data.json")
     
     if problematic_files:
         print("\nProblematic files:")
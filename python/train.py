@@ -1,4 +1,7 @@
+import os
 import json
+import shutil
+import hashlib
 from sklearn.feature_extraction.text import TfidfVectorizer
 import pickle
 from collections import Counter
@@ -16,9 +19,10 @@ def convert_sets_to_lists(obj):
         return [convert_sets_to_lists(item) for item in obj]
     return obj
 
-# Load processed data
-with open("data/processed_data.json", "r") as f:
-    data = json.load(f)
+# Load processed data, keeping the raw bytes to identify this generation
+with open("data/processed_data.json", "rb") as f:
+    data_bytes = f.read()
+data = json.loads(data_bytes)
 
 # Helper function to determine team attributes dynamically
 def get_team_attributes(pokemons):
@@ -111,15 +115,54 @@ for team in data:
 team_attributes = convert_sets_to_lists(team_attributes)
 
 # Save team attributes for later use
-with open("data/team_attributes.json", "w") as f:
+with open("data/team_attributes.json.tmp", "w") as f:
     json.dump(team_attributes, f, indent=4)
+os.replace("data/team_attributes.json.tmp", "data/team_attributes.json")
 
 # Train a TF-IDF based recommender
 vectorizer = TfidfVectorizer()
 tfidf_matrix = vectorizer.fit_transform(team_descriptions)
 
+# Helper function to write a file without exposing a partial one to readers
+def write_atomic(path, content):
+    with open(path + ".tmp", "wb") as f:
+        f.write(content)
+    os.replace(path + ".tmp", path)
+
 # Save the recommender
-with open("data/recommender.pkl", "wb") as f:
-    pickle.dump(vectorizer, f)
+model_bytes = pickle.dumps(vectorizer)
+write_atomic("data/recommender.pkl", model_bytes)
+
+# Copy the data and the model into a directory of their own, so that the
+# generation served by generate.py stays on disk while preprocess.py
+# rewrites data/processed_data.json for the next one
+data_sha256 = hashlib.sha256(data_bytes).hexdigest()
+model_sha256 = hashlib.sha256(model_bytes).hexdigest()
+version = hashlib.sha256((data_sha256 + model_sha256).encode()).hexdigest()[:12]
+generation_dir = f"data/generations/{version}"
+os.makedirs(generation_dir, exist_ok=True)
+write_atomic(f"{generation_dir}/processed_data.json", data_bytes)
+write_atomic(f"{generation_dir}/recommender.pkl", model_bytes)
+
+# Remember the generation being replaced, which running generators may still be loading
+previous_version = None
+if os.path.exists("data/manifest.json"):
+    with open("data/manifest.json", "r") as f:
+        previous_version = json.load(f)["version"]
+
+# Write the manifest last: it publishes the new generation to generate.py
+manifest = {
+    "version": version,
+    "data_path": f"{generation_dir}/processed_data.json",
+    "model_path": f"{generation_dir}/recommender.pkl",
+    "data_sha256": data_sha256,
+    "model_sha256": model_sha256
+}
+write_atomic("data/manifest.json", json.dumps(manifest, indent=4).encode())
+
+# Keep only the new and the previous generations
+for entry in os.listdir("data/generations"):
+    if entry not in (version, previous_version):
+        shutil.rmtree(f"data/generations/{entry}")
 
 print("Training complete! Models saved to the 'models' folder.")
\ No newline at end of file